@@ -251,7 +251,7 @@ def get_datasets(config):
 
 
 
-def get_dataloader(dataset, batch_size=1, num_workers=4, shuffle=True, neighborhood_limits=None):
+def get_dataloader(dataset, batch_size=1, num_workers=4, shuffle=True, neighborhood_limits=None, pin_memory=False):
     if neighborhood_limits is None:
         neighborhood_limits = calibrate_neighbors(dataset, dataset.config, collate_fn=collate_fn_descriptor)
     print("neighborhood:", neighborhood_limits)
@@ -262,7 +262,8 @@ def get_dataloader(dataset, batch_size=1, num_workers=4, shuffle=True, neighborh
         num_workers=num_workers,
         # https://discuss.pytorch.org/t/supplying-arguments-to-collate-fn/25754/4
         collate_fn=partial(collate_fn_descriptor, config=dataset.config, neighborhood_limits=neighborhood_limits),
-        drop_last=False
+        drop_last=False,
+        pin_memory=pin_memory
     )
     return dataloader, neighborhood_limits
 
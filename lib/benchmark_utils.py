@@ -223,6 +223,160 @@ def ransac_pose_estimation(src_pcd, tgt_pcd, src_feat, tgt_feat, mutual = False,
             
     return result_ransac.transformation
 
+def batched_rigid_transform(a, b):
+    """
+    Batched Kabsch, solve R, t such that R * a + t = b for every item of the batch
+    Input:
+        a:  [B,M,3]
+        b:  [B,M,3]
+    Return:
+        rot:    [B,3,3]
+        trans:  [B,3]
+    """
+    centroid_a = a.mean(1)
+    centroid_b = b.mean(1)
+    cov = (a - centroid_a[:, None, :]).transpose(-2, -1) @ (b - centroid_b[:, None, :])
+
+    # choose between +/-V[:,:,2] based on determinant to avoid reflections
+    u, _, vh = torch.linalg.svd(cov)
+    v = vh.transpose(-2, -1)
+    rot_pos = v @ u.transpose(-2, -1)
+    v_neg = v.clone()
+    v_neg[:, :, 2] *= -1
+    rot_neg = v_neg @ u.transpose(-2, -1)
+    rot = torch.where(torch.det(rot_pos)[:, None, None] > 0, rot_pos, rot_neg)
+
+    trans = centroid_b - (rot @ centroid_a[:, :, None]).squeeze(-1)
+    return rot, trans
+
+def get_feature_correspondences(src_feat, tgt_feat, mutual = False):
+    """
+    Nearest neighbour in feature space from a single torch.cdist, optionally with mutual check
+    Input:
+        src_feat:   [N,C] torch.Tensor
+        tgt_feat:   [M,C] torch.Tensor
+    Return:
+        corrs:      [K,2] (src_idx, tgt_idx), on the device of the features
+    """
+    with torch.no_grad():
+        dist = torch.cdist(src_feat, tgt_feat)
+        src_idx = torch.arange(src_feat.size(0), device=dist.device)
+        tgt_idx = dist.argmin(1)
+        if(mutual):
+            keep = dist.argmin(0)[tgt_idx] == src_idx
+            src_idx, tgt_idx = src_idx[keep], tgt_idx[keep]
+    return torch.stack([src_idx, tgt_idx], dim=1)
+
+def geometric_fitness(src_pcd, tgt_pcd, rot, trans, distance_threshold):
+    """
+    Registration score as in Open3D: fitness is the share of transformed source points that have 
+    a target point within distance_threshold, inlier_rmse the RMSE over those points. 
+    All K transformations are scored with a single batched torch.cdist
+    Input:
+        src_pcd:    [N,3]
+        tgt_pcd:    [M,3]
+        rot:        [K,3,3]
+        trans:      [K,3]
+    Return:
+        fitness, inlier_rmse: [K]
+    """
+    warped = src_pcd[None] @ rot.transpose(-2, -1) + trans[:, None, :]  #[K,N,3]
+    dist = torch.cdist(warped, tgt_pcd[None].expand(rot.size(0), -1, -1)).min(-1)[0]
+    inlier = dist < distance_threshold
+    n_inlier = inlier.sum(1)
+    fitness = n_inlier.float() / src_pcd.size(0)
+    inlier_rmse = torch.sqrt((dist.pow(2) * inlier).sum(1) / n_inlier.clamp(min=1))
+    return fitness, inlier_rmse
+
+def ransac_pose_estimation_gpu(src_pcd, tgt_pcd, src_feat, tgt_feat, mutual = False, distance_threshold = 0.05, ransac_n = 3, max_iter = 50000, batch_size = 1000, corrs = None, n_rescore = 8):
+    """
+    RANSAC pose estimation on torch tensors, all hypotheses of a batch are solved and checked in parallel
+    Uses the same edge length (0.9) and distance checkers as ransac_pose_estimation. Hypotheses are 
+    pre-ranked by the number of correspondences they fit, the top n_rescore of every batch are then 
+    scored like Open3D: highest geometric_fitness wins, ties are broken by the lower inlier RMSE.
+    The winner is refined on all of its inlier correspondences
+    Input:
+        src_pcd:    [N,3]
+        tgt_pcd:    [M,3]
+        src_feat:   [N,C]
+        tgt_feat:   [M,C]
+        corrs:      [K,2] precomputed correspondences, src_feat/tgt_feat are ignored if given
+        n_rescore:  number of hypotheses per batch scored with geometric_fitness
+    Return:
+        tsfm:       [4,4] np.ndarray
+    """
+    if(isinstance(src_pcd, torch.Tensor)):
+        device = src_pcd.device
+    elif(torch.cuda.device_count()>=1):
+        device = torch.device('cuda')
+    else:
+        device = torch.device('cpu')
+    src_pcd, tgt_pcd = to_tensor(src_pcd).float().to(device), to_tensor(tgt_pcd).float().to(device)
+
+    # 1. nearest neighbour in feature space
+    if(corrs is None):
+        src_feat, tgt_feat = to_tensor(src_feat).float().to(device), to_tensor(tgt_feat).float().to(device)
+        corrs = get_feature_correspondences(src_feat, tgt_feat, mutual)
+    corrs = corrs.to(device)
+    src_corr, tgt_corr = src_pcd[corrs[:, 0]], tgt_pcd[corrs[:, 1]]
+    n_corr = src_corr.size(0)
+
+    tsfm = torch.eye(4, device=device)
+    if(n_corr < ransac_n):
+        return to_array(tsfm)
+
+    # 2. sample, solve and score hypotheses batch by batch
+    pairs = torch.combinations(torch.arange(ransac_n, device=device), 2)
+    # keep the running best on the device, the host only reads it once after the loop
+    best_fitness = torch.zeros((), device=device)
+    best_rmse = torch.full((), float('inf'), device=device)
+    best_rot, best_trans = torch.eye(3, device=device), torch.zeros(3, device=device)
+    for start in range(0, max_iter, batch_size):
+        c_batch = min(batch_size, max_iter - start)
+        sample = torch.randint(n_corr, (c_batch, ransac_n), device=device)
+        src_sample, tgt_sample = src_corr[sample], tgt_corr[sample]  #[B,n,3]
+        rot, trans = batched_rigid_transform(src_sample, tgt_sample)
+
+        # edge length checker
+        src_edge = (src_sample[:, pairs[:, 0]] - src_sample[:, pairs[:, 1]]).norm(dim=-1)
+        tgt_edge = (tgt_sample[:, pairs[:, 0]] - tgt_sample[:, pairs[:, 1]]).norm(dim=-1)
+        valid = (torch.min(src_edge, tgt_edge) > 0.9 * torch.max(src_edge, tgt_edge)).all(1)
+        # distance checker
+        warped_sample = src_sample @ rot.transpose(-2, -1) + trans[:, None, :]
+        valid &= ((warped_sample - tgt_sample).norm(dim=-1) < distance_threshold).all(1)
+
+        warped = src_corr[None] @ rot.transpose(-2, -1) + trans[:, None, :]  #[B,K,3]
+        counts = ((warped - tgt_corr[None]).norm(dim=-1) < distance_threshold).sum(1)
+        counts = torch.where(valid, counts, torch.zeros_like(counts))
+
+        # score the most promising hypotheses on the full point clouds, 
+        # only 1-D index tensors are used so that nothing is read back to the host
+        idx = counts.topk(min(n_rescore, c_batch)).indices
+        rot_k, trans_k, count_k = rot[idx], trans[idx], counts[idx]
+        fitness, rmse = geometric_fitness(src_pcd, tgt_pcd, rot_k, trans_k, distance_threshold)
+        fitness = torch.where(count_k > 0, fitness, torch.zeros_like(fitness))
+
+        # highest fitness first, lowest rmse among equal fitness
+        rmse_tie = torch.where(fitness == fitness.max(), rmse, torch.full_like(rmse, float('inf')))
+        c_best = rmse_tie.argmin().view(1)
+        c_fitness, c_rmse = fitness.index_select(0, c_best)[0], rmse.index_select(0, c_best)[0]
+        better = (c_fitness > 0) & ((c_fitness > best_fitness) | ((c_fitness == best_fitness) & (c_rmse < best_rmse)))
+        best_fitness = torch.where(better, c_fitness, best_fitness)
+        best_rmse = torch.where(better, c_rmse, best_rmse)
+        best_rot = torch.where(better, rot_k.index_select(0, c_best)[0], best_rot)
+        best_trans = torch.where(better, trans_k.index_select(0, c_best)[0], best_trans)
+
+    if(best_fitness.item() == 0):
+        return to_array(tsfm)
+
+    # 3. refine on all inliers of the best hypothesis
+    warped = src_corr @ best_rot.T + best_trans[None]
+    inliers = (warped - tgt_corr).norm(dim=-1) < distance_threshold
+    rot, trans = batched_rigid_transform(src_corr[inliers][None], tgt_corr[inliers][None])
+    tsfm[:3, :3] = rot[0]
+    tsfm[:3, 3] = trans[0]
+    return to_array(tsfm)
+
 def get_inlier_ratio(src_pcd, tgt_pcd, src_feat, tgt_feat, rot, trans, inlier_distance_threshold = 0.1):
     """
     Compute inlier ratios with and without mutual check, return both
@@ -97,6 +97,29 @@ def square_distance(src, dst, normalised = False):
     return dist
     
 
+def voxel_downsample(pcd, voxel_size):
+    """
+    Keep the first point of every occupied voxel, runs on the device of pcd
+    Args:
+        pcd: [N, 3] torch.Tensor
+        voxel_size: edge length of the voxel grid
+    Returns:
+        pcd: [M, 3], M <= N, points keep their original order
+    """
+    if(pcd.size(0) == 0):
+        return pcd
+    keys = torch.floor(pcd / voxel_size).long()
+    keys -= keys.min(0)[0]
+    extent = keys.max(0)[0] + 1
+    keys = (keys[:, 0] * extent[1] + keys[:, 1]) * extent[2] + keys[:, 2]
+
+    _, inverse = torch.unique(keys, return_inverse=True)
+    arange = torch.arange(pcd.size(0), device=pcd.device)
+    first = torch.full((int(inverse.max()) + 1,), pcd.size(0), dtype=torch.long, device=pcd.device)
+    first.scatter_reduce_(0, inverse, arange, reduce='amin')
+    return pcd[torch.sort(first)[0]]
+
+
 def validate_gradient(model):
     """
     Confirm all the gradients are non-nan and non-inf
@@ -1,8 +1,10 @@
 import json
+import struct
 import requests
 import numpy as np
 import os
 import sys
+import time
 import torch
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
@@ -10,20 +12,30 @@ sys.path.append(ROOT_DIR)
 
 # 服务地址
 URL = "http://127.0.0.1:8000"
+# 连续发送的请求数（>1 时用于测量热启动吞吐）
+N_REQUESTS = 1
 
-src = torch.load("/home/dl/workspace/python_project/OverlapPredator/data/indoor/test/7-scenes-redkitchen/cloud_bin_0.pth").tolist()
-tgt = torch.load("/home/dl/workspace/python_project/OverlapPredator/data/indoor/test/7-scenes-redkitchen/cloud_bin_3.pth").tolist()
+# 复用同一个 keep-alive 连接
+session = requests.Session()
 
+src = np.asarray(torch.load("/home/dl/workspace/python_project/OverlapPredator/data/indoor/test/7-scenes-redkitchen/cloud_bin_0.pth"), dtype=np.float32)
+tgt = np.asarray(torch.load("/home/dl/workspace/python_project/OverlapPredator/data/indoor/test/7-scenes-redkitchen/cloud_bin_3.pth"), dtype=np.float32)
 
-# 打包成 JSON
-payload = {
-    "src": src,
-    "tgt": tgt
+
+# 打包成二进制: 8 字节头 (n_src, n_tgt) + src/tgt 的 float32 原始数据
+payload = struct.pack("<II", len(src), len(tgt)) + src.tobytes() + tgt.tobytes()
+
+headers = {
+    "Content-Type": "application/octet-stream",
+    "Content-Length": str(len(payload)),
 }
 
 # 发送 POST 请求
 print("Sending request to Predator service...")
-resp = requests.post(URL, json=payload)
+for i in range(N_REQUESTS):
+    start = time.time()
+    resp = session.post(URL, data=payload, headers=headers)
+    print(f"Request {i + 1}/{N_REQUESTS}: {time.time() - start:.3f}s")
 
 # 打印结果
 print("Status:", resp.status_code)
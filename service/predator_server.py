@@ -1,7 +1,13 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import hashlib
+import itertools
 import os
+import queue
+import struct
 import sys
+import threading
+from concurrent.futures import Future
+import orjson
 import torch
 import numpy as np
 from torch.utils.data import Dataset
@@ -15,8 +21,8 @@ sys.path.append(ROOT_DIR)
 from models.architectures import KPFCNN
 from datasets.indoor import IndoorDataset
 from datasets.dataloader import get_dataloader
-from lib.utils import load_obj, load_config
-from lib.benchmark_utils import ransac_pose_estimation
+from lib.utils import load_obj, load_config, voxel_downsample
+from lib.benchmark_utils import ransac_pose_estimation, ransac_pose_estimation_gpu, get_feature_correspondences
 
 ###############################################
 # 1. 加载 config + 模型 + neighborhood_limits
@@ -30,6 +36,15 @@ config = load_config(config_path)
 config = edict(config)
 
 config.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+# 仅在 CUDA 上启用 FP16 autocast
+config.use_amp = config.device.type == "cuda"
+torch.backends.cudnn.benchmark = True
+# 专用于 H2D 拷贝的 CUDA stream（CPU 下为 None，torch.cuda.stream(None) 不做任何事）
+copy_stream = torch.cuda.Stream() if config.device.type == "cuda" else None
+# 是否在推理前按 first_subsampling_dl 做体素下采样（客户端已发送体素化点云时保持关闭）
+config.voxel_downsample = False
+# RANSAC 后端：False 使用官方 Open3D 实现；True 使用 GPU 批量 RANSAC（尚未与 Open3D 结果逐一对比验证）
+config.gpu_ransac = False
 
 # 构造模型结构
 config.architecture = ["simple", "resnetb"]
@@ -43,23 +58,54 @@ for i in range(config.num_layers - 2):
 config.architecture.append("nearest_upsample")
 config.architecture.append("last_unary")
 
-# 初始化模型
-config.model = KPFCNN(config).to(config.device)
+# 初始化模型（先在 CPU 上构造，加载权重后一次性搬到 device）
+config.model = KPFCNN(config)
 
-# 加载预训练权重
-state = torch.load(config.pretrain, map_location=config.device)
+# 加载预训练权重：mmap 映射到 CPU，避免整份读入后再拷贝；旧格式 checkpoint 回退到普通加载
+try:
+    state = torch.load(config.pretrain, map_location="cpu", mmap=True, weights_only=True)
+except Exception as e:
+    print(f"mmap/weights_only load failed ({type(e).__name__}), fallback to full load.")
+    state = torch.load(config.pretrain, map_location="cpu")
 config.model.load_state_dict(state["state_dict"])
-config.model.eval()
-
-# 计算 neighborhood_limits
-info_train = load_obj(config.train_info)
-train_set = IndoorDataset(info_train, config, data_augmentation=False)
-_, neighborhood_limits = get_dataloader(
-    dataset=train_set,
-    batch_size=config.batch_size,
-    shuffle=False,
-    num_workers=1,
-)
+del state
+config.model = config.model.to(config.device).eval()
+
+# 启动时编译一次模型：优先 TorchScript，失败则回退到 torch.compile
+# （torch.compile 在首次调用时才真正编译，见下方 warmup_model）
+eager_model = config.model
+try:
+    config.model = torch.jit.script(eager_model)
+    print("KPFCNN compiled with TorchScript.")
+except Exception as e:
+    print(f"TorchScript failed ({type(e).__name__}), fallback to torch.compile.")
+    config.model = torch.compile(eager_model, dynamic=True, fullgraph=False)
+
+# 计算 neighborhood_limits：结果缓存到 cache/ 下，key 由影响邻域统计的配置项决定，配置变化时自动失效
+cache_key = hashlib.md5(repr((
+    config.pretrain,
+    config.train_info,
+    config.num_layers,
+    config.first_subsampling_dl,
+    config.conv_radius,
+    config.deform_radius,
+)).encode("utf-8")).hexdigest()
+neighborhood_cache = os.path.join(ROOT_DIR, "cache", f"neighborhood_limits_{cache_key}.npy")
+
+if os.path.exists(neighborhood_cache):
+    neighborhood_limits = np.load(neighborhood_cache).tolist()
+    print("Loaded cached neighborhood_limits:", neighborhood_limits)
+else:
+    info_train = load_obj(config.train_info)
+    train_set = IndoorDataset(info_train, config, data_augmentation=False)
+    _, neighborhood_limits = get_dataloader(
+        dataset=train_set,
+        batch_size=config.batch_size,
+        shuffle=False,
+        num_workers=1,
+    )
+    os.makedirs(os.path.dirname(neighborhood_cache), exist_ok=True)
+    np.save(neighborhood_cache, np.asarray(neighborhood_limits))
 config.neighborhood_limits = neighborhood_limits
 
 print("Predator model ready.")
@@ -71,8 +117,9 @@ class ThreeDMatchDemo(Dataset):
     def __init__(self, config, src_points, tgt_points):
         super(ThreeDMatchDemo, self).__init__()
         self.config = config
-        self.src_pcd = np.asarray(src_points, dtype=np.float32)
-        self.tgt_pcd = np.asarray(tgt_points, dtype=np.float32)
+        # src_points / tgt_points 已是 [N,3] float32 ndarray，由 do_POST 负责解码
+        self.src_pcd = src_points
+        self.tgt_pcd = tgt_points
 
     def __len__(self):
         return 1
@@ -101,86 +148,165 @@ class ThreeDMatchDemo(Dataset):
             torch.ones(1, dtype=torch.float32),
         )
 
+# 常驻的 Dataset + DataLoader：每个请求只替换点云，不再重建
+demo_set = ThreeDMatchDemo(
+    config,
+    np.zeros((0, 3), dtype=np.float32),
+    np.zeros((0, 3), dtype=np.float32),
+)
+demo_loader, _ = get_dataloader(
+    dataset=demo_set,
+    batch_size=config.batch_size,
+    shuffle=False,
+    num_workers=0,
+    neighborhood_limits=config.neighborhood_limits,
+    pin_memory=copy_stream is not None,
+)
+
 ###############################################
 # 3. predator_infer
 ###############################################
-def predator_infer(config, src_points, tgt_points):
+def model_forward(config, src_points, tgt_points):
     """
-    输入：
-        src_points, tgt_points: [[x,y,z], ...]
+    构造 batch 并完成 KPFCNN 前向
     输出：
-        dict {
-            "transform": 4x4 刚体变换矩阵（list[list[float]]） 或 None
-        }
+        inputs, feats, scores_overlap, scores_saliency
     """
-    # 1. 构造只含一对点云的 DemoDataset 和 DataLoader
-    demo_set = ThreeDMatchDemo(config, src_points, tgt_points)
-    demo_loader, _ = get_dataloader(
-        dataset=demo_set,
-        batch_size=config.batch_size,
-        shuffle=False,
-        num_workers=0,
-        neighborhood_limits=config.neighborhood_limits,
-    )
+    # 0. 可选：在 device 上做体素下采样（体素大小同 first_subsampling_dl），减少进入 KPFCNN 的点数
+    if config.voxel_downsample:
+        src_points = voxel_downsample(torch.from_numpy(src_points).to(config.device), config.first_subsampling_dl).cpu().numpy()
+        tgt_points = voxel_downsample(torch.from_numpy(tgt_points).to(config.device), config.first_subsampling_dl).cpu().numpy()
+
+    # 1. 把这一对点云放进常驻的 demo_set，复用同一个 DataLoader
+    #    （只由 forward worker 线程调用，因此原地修改是安全的）
+    demo_set.src_pcd = src_points
+    demo_set.tgt_pcd = tgt_points
 
     c_loader_iter = iter(demo_loader)
     inputs = next(c_loader_iter)
 
-    # 2. 把 batch 移到 device（完全照官方 main）
-    for k, v in inputs.items():
-        if isinstance(v, list):
-            inputs[k] = [item.to(config.device) for item in v]
-        else:
-            inputs[k] = v.to(config.device)
-
-    # 3. 前向推理
-    with torch.no_grad():
+    # 2. 把 batch 移到 device：batch 已在 pinned memory 中，在 copy_stream 上异步拷贝
+    with torch.cuda.stream(copy_stream):
+        for k, v in inputs.items():
+            if isinstance(v, list):
+                inputs[k] = [item.to(config.device, non_blocking=True) for item in v]
+            else:
+                inputs[k] = v.to(config.device, non_blocking=True)
+    if copy_stream is not None:
+        compute_stream = torch.cuda.current_stream()
+        compute_stream.wait_stream(copy_stream)
+        # 张量在 copy_stream 上分配、在当前 stream 上使用，需告知缓存分配器，避免被提前复用
+        for v in inputs.values():
+            for t in (v if isinstance(v, list) else [v]):
+                if isinstance(t, torch.Tensor) and t.is_cuda:
+                    t.record_stream(compute_stream)
+
+    # 3. 前向推理（inference_mode + FP16 autocast，BatchNorm 等由 autocast 保持 FP32）
+    with torch.inference_mode(), torch.autocast(
+        device_type=config.device.type, dtype=torch.float16, enabled=config.use_amp
+    ):
         feats, scores_overlap, scores_saliency = config.model(inputs)
+    # 后处理（采样、RANSAC）统一使用 FP32
+    return inputs, feats.float(), scores_overlap.float(), scores_saliency.float()
+
+
+def model_forward_with_fallback(config, src_points, tgt_points):
+    """
+    同 model_forward；编译后的模型运行失败（如针对新形状重新编译失败）时，
+    回退到 eager 模型并重试一次
+    """
+    try:
+        return model_forward(config, src_points, tgt_points)
+    except Exception as e:
+        if config.model is eager_model:
+            raise
+        print(f"Compiled model failed ({type(e).__name__}), fallback to eager mode.")
+        config.model = eager_model
+        return model_forward(config, src_points, tgt_points)
+
+
+def warmup_model(config, n_iter=2, n_points=20000):
+    """
+    用接近真实规模的随机点云跑几次前向，把编译开销留在启动阶段
+    编译后的模型若无法运行，则回退到 eager 模型
+    """
+    for _ in range(n_iter):
+        src_points = np.random.rand(n_points, 3).astype(np.float32) * 3
+        tgt_points = np.random.rand(n_points, 3).astype(np.float32) * 3
+        model_forward_with_fallback(config, src_points, tgt_points)
+
+
+def gumbel_topk(scores, k):
+    """
+    按 scores 成比例地做 k 个不放回采样（Gumbel-top-k），只需一次 O(N) 的 topk
+    """
+    gumbel = -torch.log(-torch.log(torch.rand_like(scores).clamp_min(1e-12)))
+    keys = torch.log(scores.clamp_min(1e-12)) + gumbel
+    return keys.topk(k).indices
+
+
+def predator_infer(config, src_points, tgt_points):
+    """
+    输入：
+        src_points, tgt_points: [N,3] / [M,3] float32 ndarray
+    输出：
+        dict {
+            "transform": 4x4 刚体变换矩阵（np.ndarray） 或 None
+        }
+    """
+    return estimate_transform(config, *model_forward(config, src_points, tgt_points))
 
+
+def estimate_transform(config, inputs, feats, scores_overlap, scores_saliency):
+    """
+    由 model_forward 的输出做采样 + RANSAC，输出同 predator_infer
+    """
     pcd = inputs["points"][0]
     len_src = inputs["stack_lengths"][0][0]
 
     src_pcd = pcd[:len_src]
     tgt_pcd = pcd[len_src:]
 
-    src_raw = src_pcd.clone()
-    tgt_raw = tgt_pcd.clone()
-
-    src_feats = feats[:len_src].detach().cpu()
-    tgt_feats = feats[len_src:].detach().cpu()
-    src_overlap = scores_overlap[:len_src].detach().cpu()
-    tgt_overlap = scores_overlap[len_src:].detach().cpu()
-    src_saliency = scores_saliency[:len_src].detach().cpu()
-    tgt_saliency = scores_saliency[len_src:].detach().cpu()
+    src_feats = feats[:len_src]
+    tgt_feats = feats[len_src:]
 
-    # 4. 按 overlap * saliency 做概率采样（完全照官方 main）
-    src_scores = src_overlap * src_saliency
-    tgt_scores = tgt_overlap * tgt_saliency
+    # 4. 按 overlap * saliency 在 device 上做概率采样（Gumbel-top-k 替代 np.random.choice）
+    src_scores = scores_overlap[:len_src] * scores_saliency[:len_src]
+    tgt_scores = scores_overlap[len_src:] * scores_saliency[len_src:]
 
     if src_pcd.size(0) > config.n_points:
-        idx = np.arange(src_pcd.size(0))
-        probs = (src_scores / src_scores.sum()).numpy().flatten()
-        idx = np.random.choice(idx, size=config.n_points, replace=False, p=probs)
+        idx = gumbel_topk(src_scores, config.n_points)
         src_pcd = src_pcd[idx]
         src_feats = src_feats[idx]
 
     if tgt_pcd.size(0) > config.n_points:
-        idx = np.arange(tgt_pcd.size(0))
-        probs = (tgt_scores / tgt_scores.sum()).numpy().flatten()
-        idx = np.random.choice(idx, size=config.n_points, replace=False, p=probs)
+        idx = gumbel_topk(tgt_scores, config.n_points)
         tgt_pcd = tgt_pcd[idx]
         tgt_feats = tgt_feats[idx]
 
-    # 5. RANSAC 估计位姿（完全照官方 main）
-    tsfm = ransac_pose_estimation(
-        src_pcd,
-        tgt_pcd,
-        src_feats,
-        tgt_feats,
-        mutual=False,
-    )
+    if config.gpu_ransac:
+        # 5. 特征匹配：一次 torch.cdist + argmin 得到对应关系，特征不离开 GPU
+        corrs = get_feature_correspondences(src_feats, tgt_feats, mutual=False)
+
+        # 6. RANSAC 估计位姿：所有假设在 device 上批量求解和打分
+        tsfm = ransac_pose_estimation_gpu(
+            src_pcd,
+            tgt_pcd,
+            src_feats,
+            tgt_feats,
+            corrs=corrs,
+        )
+    else:
+        # 5-6. RANSAC 估计位姿（完全照官方 main）
+        tsfm = ransac_pose_estimation(
+            src_pcd.cpu(),
+            tgt_pcd.cpu(),
+            src_feats.cpu(),
+            tgt_feats.cpu(),
+            mutual=False,
+        )
 
-    # 6. 处理失败情况 + 统一转 numpy
+    # 7. 处理失败情况 + 统一转 numpy
     if tsfm is None:
         print(">>> RANSAC failed, return None")
         return {"transform": None}
@@ -190,13 +316,92 @@ def predator_infer(config, src_points, tgt_points):
     else:
         tsfm = np.asarray(tsfm)
 
+    # 保持 ndarray，由 orjson 直接序列化
     return {
-        "transform": tsfm.tolist()
+        "transform": np.ascontiguousarray(tsfm)
     }
 
 ###############################################
-# 4. HTTP Handler
+# 4. 推理 worker
 ###############################################
+# 两级流水线：forward worker 负责构造 batch + 前向，post worker 负责采样 + RANSAC。
+# 每个请求按轮转分配一个 CUDA stream，两级都在该 stream 上执行，同一 stream 内天然有序，
+# 因此请求 N 的后处理可以与请求 N+1 的 batch 构造 / H2D / 前向重叠，无需跨 stream 同步
+config.n_streams = 2
+streams = [torch.cuda.Stream() for _ in range(config.n_streams)] if config.device.type == "cuda" else [None]
+infer_queue = queue.Queue()
+post_queue = queue.Queue()
+
+
+def _forward_worker():
+    for i in itertools.count():
+        src_points, tgt_points, fut = infer_queue.get()
+        stream = streams[i % len(streams)]
+        try:
+            with torch.cuda.stream(stream):
+                outputs = model_forward_with_fallback(config, src_points, tgt_points)
+        except Exception as e:
+            fut.set_exception(e)
+            continue
+        post_queue.put((stream, outputs, fut))
+
+
+def _post_worker():
+    while True:
+        stream, outputs, fut = post_queue.get()
+        try:
+            with torch.cuda.stream(stream):
+                fut.set_result(estimate_transform(config, *outputs))
+        except Exception as e:
+            fut.set_exception(e)
+
+
+def submit_infer(src_points, tgt_points):
+    """
+    把一对点云交给推理流水线，返回 concurrent.futures.Future
+    """
+    fut = Future()
+    infer_queue.put((src_points, tgt_points, fut))
+    return fut
+
+
+threading.Thread(target=_forward_worker, daemon=True).start()
+threading.Thread(target=_post_worker, daemon=True).start()
+
+###############################################
+# 5. HTTP Handler
+###############################################
+# 二进制请求格式: struct.pack('<II', n_src, n_tgt) + src(float32) + tgt(float32)
+BIN_HEADER = struct.Struct("<II")
+
+
+def check_points(points, name):
+    """
+    检查点云为 (N, 3) 数组，否则抛出 ValueError
+    """
+    if points.ndim != 2 or points.shape[1] != 3:
+        raise ValueError(f"{name} must have shape (N, 3), got {points.shape}")
+    return points
+
+
+def decode_points(body):
+    """
+    从二进制请求体中解码 src / tgt 点云（零拷贝 np.frombuffer）
+    请求体长度必须为 8 + 12 * (n_src + n_tgt)，否则抛出 ValueError
+    """
+    if len(body) < BIN_HEADER.size:
+        raise ValueError(f"body too short for header: {len(body)} bytes")
+    n_src, n_tgt = BIN_HEADER.unpack_from(body, 0)
+    expected = BIN_HEADER.size + 12 * (n_src + n_tgt)
+    if len(body) != expected:
+        raise ValueError(f"body length {len(body)} != {expected} for n_src={n_src}, n_tgt={n_tgt}")
+    offset = BIN_HEADER.size
+    src = np.frombuffer(body, dtype=np.float32, count=n_src * 3, offset=offset).reshape(n_src, 3)
+    offset += n_src * 3 * 4
+    tgt = np.frombuffer(body, dtype=np.float32, count=n_tgt * 3, offset=offset).reshape(n_tgt, 3)
+    return src, tgt
+
+
 class PredatorHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         msg = "Predator point cloud registration service".encode("utf-8")
@@ -208,17 +413,17 @@ class PredatorHandler(BaseHTTPRequestHandler):
 
     def do_POST(self):
         print(">>> Received POST")
-        length = int(self.headers["Content-Length"])
-        body = self.rfile.read(length)
-        data = json.loads(body.decode("utf-8"))
-
-        src_points = data["src"]
-        tgt_points = data["tgt"]
-
-        result = predator_infer(config, src_points, tgt_points)
+        try:
+            src_points, tgt_points = self.read_points()
+        except ValueError as e:
+            # 请求体被截断或格式不对：返回 400，而不是在线程里抛异常断开连接
+            self.send_error(400, str(e))
+            return
+
+        result = submit_infer(src_points, tgt_points).result()
         print(">>> result from predator_infer:", result)
 
-        resp = json.dumps(result).encode("utf-8")
+        resp = orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY)
 
         self.send_response(200)
         self.send_header("Content-Type", "application/json;charset=utf-8")
@@ -226,9 +431,41 @@ class PredatorHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(resp)
 
+    def read_points(self):
+        """
+        读取并解码请求体，返回 (src_points, tgt_points)，请求不合法时抛出 ValueError
+        """
+        try:
+            length = int(self.headers["Content-Length"])
+        except (TypeError, ValueError):
+            raise ValueError("missing or invalid Content-Length")
+        content_type = self.headers.get("Content-Type", "")
+
+        if content_type.startswith("application/octet-stream"):
+            # 读入可写 buffer，np.frombuffer 得到的数组无需再拷贝
+            body = bytearray(length)
+            n_read = self.rfile.readinto(body)
+            if n_read != length:
+                raise ValueError(f"read {n_read} of {length} bytes")
+            return decode_points(body)
+
+        # 兼容旧的 JSON 格式 {"src": [[x,y,z], ...], "tgt": [...]}
+        body = self.rfile.read(length)
+        try:
+            data = orjson.loads(body)
+            src_points = np.asarray(data["src"], dtype=np.float32)
+            tgt_points = np.asarray(data["tgt"], dtype=np.float32)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"invalid JSON body: {e}")
+        return check_points(src_points, "src"), check_points(tgt_points, "tgt")
+
 ###############################################
-# 5. 启动服务
+# 6. 启动服务
 ###############################################
-server = HTTPServer(("0.0.0.0", 8000), PredatorHandler)
+print("Warming up Predator model...")
+warmup_model(config)
+
+# 每个连接一个线程：请求解码 / 响应编码可以并发，GPU 推理仍由 worker 串行执行
+server = ThreadingHTTPServer(("0.0.0.0", 8000), PredatorHandler)
 print("Predator service running on port 8000...")
 server.serve_forever()
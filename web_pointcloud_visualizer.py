@@ -7,15 +7,175 @@
 
 import torch
 import numpy as np
-import open3d as o3d
 import glob
+import gzip
 import os
-import json
+import orjson
 import http.server
-import socketserver
+from http.server import ThreadingHTTPServer
 import threading
-import webbrowser
-from datetime import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def quantize_points(points):
+    """按包围盒把坐标量化为uint16，返回 (q, lo, hi)，还原: lo + q / 65535 * (hi - lo)"""
+    lo = points.min(0)
+    hi = points.max(0)
+    scale = 65535 / np.maximum(hi - lo, 1e-12)
+    # 平移、缩放、取整在同一块临时内存上原地完成
+    scaled = np.subtract(points, lo)
+    scaled *= scale
+    np.rint(scaled, out=scaled)
+    return scaled.astype(np.uint16), lo, hi
+
+
+def quantized_buffer(points):
+    """/bin/ 接口提供的一份点云：uint16量化数据、其gzip压缩结果及包围盒"""
+    q, lo, hi = quantize_points(points)
+    return {'data': q, 'gz': gzip.compress(q.data, compresslevel=6), 'lo': lo, 'hi': hi}
+
+
+# 样本统计信息的结构化记录，未使用体素下采样时voxel_size为NaN（序列化为null）
+STATS_DTYPE = np.dtype([
+    ('source_original', np.int32),
+    ('target_original', np.int32),
+    ('source_downsampled', np.int32),
+    ('target_downsampled', np.int32),
+    ('downsample_factor', np.int32),
+    ('voxel_size', np.float32),
+])
+
+
+def sample_metadata(index, sample):
+    """样本的元数据，点云本身通过 /bin/<index>/<field> 以uint16二进制提供"""
+    meta = {k: v for k, v in sample.items() if k not in ('buffers', 'stats')}
+    meta['stats'] = dict(zip(STATS_DTYPE.names, sample['stats'].tolist()))
+    meta['buffers'] = {
+        field: {
+            'url': f"/bin/{index}/{field}",
+            'byte_length': buffer['data'].nbytes,
+            'lo': buffer['lo'],
+            'hi': buffer['hi'],
+        }
+        for field, buffer in sample['buffers'].items()
+    }
+    return meta
+
+
+def voxel_downsample(pcd, voxel_size):
+    """每个被占据的体素保留第一个点，保持原有点序"""
+    if len(pcd) == 0:
+        return pcd
+    keys = np.floor(pcd / voxel_size).astype(np.int64)
+    keys -= keys.min(0)
+    extent = keys.max(0) + 1
+    keys = (keys[:, 0] * extent[1] + keys[:, 1]) * extent[2] + keys[:, 2]
+    _, first = np.unique(keys, return_index=True)
+    return pcd[np.sort(first)]
+
+
+def transform_points(points, rot, trans):
+    """float32 行向量形式的一次GEMM: points @ rot.T + trans，输入须为C连续的float32"""
+    rot_t = np.ascontiguousarray(rot.T)
+    transformed = np.empty_like(points)
+    np.dot(points, rot_t, out=transformed)
+    np.add(transformed, trans.reshape(1, 3), out=transformed)
+    return transformed
+
+
+def _downsample_transform_numpy(pcd, len_src, rot, trans, step):
+    """按步长下采样源/目标点云并变换源点云，返回 (src_points, tgt_points, src_transformed)"""
+    src_points = np.ascontiguousarray(pcd[:len_src:step], dtype=np.float32)
+    tgt_points = np.ascontiguousarray(pcd[len_src::step], dtype=np.float32)
+    return src_points, tgt_points, transform_points(src_points, rot, trans)
+
+
+def _downsample_transform_kernel(pcd, len_src, rot, trans, step):
+    """同 _downsample_transform_numpy，下采样、旋转、平移在一次遍历中完成"""
+    n_src = (len_src + step - 1) // step
+    n_tgt = (pcd.shape[0] - len_src + step - 1) // step
+    src_points = np.empty((n_src, 3), dtype=np.float32)
+    tgt_points = np.empty((n_tgt, 3), dtype=np.float32)
+    src_transformed = np.empty((n_src, 3), dtype=np.float32)
+    for i in range(n_src):
+        p = pcd[i * step]
+        for r in range(3):
+            src_points[i, r] = p[r]
+            src_transformed[i, r] = rot[r, 0] * p[0] + rot[r, 1] * p[1] + rot[r, 2] * p[2] + trans[r]
+    for i in range(n_tgt):
+        for r in range(3):
+            tgt_points[i, r] = pcd[len_src + i * step, r]
+    return src_points, tgt_points, src_transformed
+
+
+# 有numba时编译融合后的kernel，否则退回numpy实现
+# 样本已由进程池并行处理，kernel本身单线程运行，避免每个worker再各自启动cpu_count个线程
+if njit is not None:
+    _downsample_transform = njit(fastmath=True, cache=True)(_downsample_transform_kernel)
+else:
+    _downsample_transform = _downsample_transform_numpy
+
+
+def downsample_transform(pcd, len_src, rot, trans, step):
+    """按步长下采样并变换源点云，返回 (src_points, tgt_points, src_transformed)，输入须为C连续的float32"""
+    return _downsample_transform(pcd, int(len_src), rot, trans.reshape(3), int(step))
+
+
+def _load_one(path, downsample_factor=10, voxel_size=None):
+    """在子进程中读取并处理单个测试结果文件，返回不含sample_id的样本数据"""
+    data = torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+    
+    # 提取数据，在入口处统一为C连续的float32（已满足时 np.require 直接返回与 mmap 共享内存的视图）
+    pcd = np.require(data['pcd'].numpy(), dtype=np.float32, requirements=['C'])
+    len_src = data['len_src']
+    rot = np.require(data['rot'].numpy(), dtype=np.float32, requirements=['C'])
+    trans = np.require(data['trans'].numpy(), dtype=np.float32, requirements=['C'])
+    
+    # 分离点云
+    src_pcd = pcd[:len_src]
+    tgt_pcd = pcd[len_src:]
+    
+    # 下采样以减少数据量并应用变换到源点云
+    if voxel_size is not None:
+        src_points = voxel_downsample(src_pcd, voxel_size)
+        tgt_points = voxel_downsample(tgt_pcd, voxel_size)
+        src_transformed = transform_points(src_points, rot, trans)
+    else:
+        src_points, tgt_points, src_transformed = downsample_transform(
+            pcd, len_src, rot, trans, downsample_factor)
+    
+    # 构建变换矩阵
+    transform_matrix = np.eye(4)
+    transform_matrix[:3, :3] = rot
+    transform_matrix[:3, 3] = trans.flatten()
+    
+    return {
+        'filename': os.path.basename(path),
+        'buffers': {
+            'src': quantized_buffer(src_points),
+            'tgt': quantized_buffer(tgt_points),
+            'src_transformed': quantized_buffer(src_transformed),
+        },
+        'transform': {
+            'rotation': rot,
+            'translation': trans,
+            'matrix': transform_matrix
+        },
+        'stats': np.array((
+            len(src_pcd),
+            len(tgt_pcd),
+            len(src_points),
+            len(tgt_points),
+            downsample_factor,
+            np.nan if voxel_size is None else voxel_size,
+        ), dtype=STATS_DTYPE)
+    }
 
 
 class PointCloudWebVisualizer:
@@ -23,83 +183,76 @@ class PointCloudWebVisualizer:
         self.snapshot_dir = snapshot_dir
         self.port = port
         self.results = []
+        self._results_lock = threading.Lock()
+        self._json_bytes = b'[]'
+        self._json_gz = gzip.compress(self._json_bytes)
+        self.loading = False
+        self.html_bytes = b''
         self.current_sample = 0
         
-    def load_test_results(self, max_samples=20, downsample_factor=10):
-        """加载测试结果文件"""
+    def find_result_files(self):
+        """返回快照目录下的测试结果文件，目录不存在或为空时返回空列表"""
         benchmark_path = os.path.join(self.snapshot_dir, "indoor", "3DMatch")
         
         if not os.path.exists(benchmark_path):
             print("❌ 测试结果目录不存在:", benchmark_path)
-            return False
+            return []
             
         result_files = glob.glob(os.path.join(benchmark_path, "*.pth"))
         print(f"✅ 找到 {len(result_files)} 个测试结果文件")
         
         if len(result_files) == 0:
             print("❌ 未找到.pth文件")
+        return result_files
+    
+    def load_test_results(self, max_samples=20, downsample_factor=10, voxel_size=None, result_files=None):
+        """加载测试结果文件，指定voxel_size时用体素下采样代替按步长下采样"""
+        # 无论以何种方式结束，都要让 /data/count 停止报告加载中
+        try:
+            return self._load_test_results(max_samples, downsample_factor, voxel_size, result_files)
+        finally:
+            self.loading = False
+    
+    def _load_test_results(self, max_samples, downsample_factor, voxel_size, result_files):
+        if result_files is None:
+            result_files = self.find_result_files()
+        if len(result_files) == 0:
             return False
         
-        # 加载指定数量的样本
-        for i, result_file in enumerate(result_files[:max_samples]):
-            try:
-                print(f"📥 加载样本 {i+1}: {os.path.basename(result_file)}")
-                data = torch.load(result_file)
-                
-                # 提取数据
-                pcd = data['pcd'].numpy()
-                len_src = data['len_src']
-                rot = data['rot'].numpy()
-                trans = data['trans'].numpy()
-                
-                # 分离点云
-                src_pcd = pcd[:len_src]
-                tgt_pcd = pcd[len_src:]
-                
-                # 下采样以减少数据量
-                src_points = src_pcd[::downsample_factor]
-                tgt_points = tgt_pcd[::downsample_factor]
-                
-                # 构建变换矩阵
-                transform_matrix = np.eye(4)
-                transform_matrix[:3, :3] = rot
-                transform_matrix[:3, 3] = trans.flatten()
-                
-                # 应用变换到源点云
-                src_transformed = (rot @ src_points.T + trans).T
-                
-                sample_data = {
-                    'sample_id': i,
-                    'filename': os.path.basename(result_file),
-                    'source_points': src_points.tolist(),
-                    'target_points': tgt_points.tolist(),
-                    'source_transformed': src_transformed.tolist(),
-                    'transform': {
-                        'rotation': rot.tolist(),
-                        'translation': trans.tolist(),
-                        'matrix': transform_matrix.tolist()
-                    },
-                    'stats': {
-                        'source_original': len(src_pcd),
-                        'target_original': len(tgt_pcd),
-                        'source_downsampled': len(src_points),
-                        'target_downsampled': len(tgt_points),
-                        'downsample_factor': downsample_factor
-                    }
-                }
-                
-                self.results.append(sample_data)
-                print(f"   ✅ 加载成功: {len(src_points)}源点, {len(tgt_points)}目标点")
+        # 多进程并行读取并处理文件，按顺序收集结果
+        result_files = result_files[:max_samples]
+        # 先在主进程中编译kernel并写入numba缓存，worker直接加载缓存，不会同时各自编译
+        downsample_transform(np.zeros((1, 3), np.float32), 1, np.eye(3, dtype=np.float32), np.zeros(3, np.float32), 1)
+        # 此时HTTP服务线程已在运行，用spawn启动worker，避免fork多线程进程时继承被其他线程持有的锁
+        with ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 1) // 2),
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            loads = [executor.submit(_load_one, f, downsample_factor, voxel_size) for f in result_files]
+            
+            # 加载指定数量的样本
+            for i, result_file in enumerate(result_files):
+                try:
+                    print(f"📥 加载样本 {i+1}: {os.path.basename(result_file)}")
+                    sample_data = loads[i].result()
+                    sample_data['sample_id'] = i
+                    
+                    # 服务器可能已在运行，每加载完一个样本就更新 /data 的元数据
+                    with self._results_lock:
+                        self.results.append(sample_data)
+                        self._json_bytes = orjson.dumps(
+                            [sample_metadata(j, sample) for j, sample in enumerate(self.results)],
+                            option=orjson.OPT_SERIALIZE_NUMPY)
+                        self._json_gz = gzip.compress(self._json_bytes, compresslevel=6)
+                    print(f"   ✅ 加载成功: {sample_data['stats']['source_downsampled']}源点, {sample_data['stats']['target_downsampled']}目标点")
                 
-            except Exception as e:
-                print(f"   ❌ 加载失败: {e}")
-                continue
+                except Exception as e:
+                    print(f"   ❌ 加载失败: {e}")
+                    continue
                 
         print(f"✅ 成功加载 {len(self.results)} 个样本")
         return len(self.results) > 0
     
-    def generate_web_interface(self):
-        """生成完整的Web界面"""
+    def generate_web_interface(self, write_file=False):
+        """生成完整的Web界面，页面由服务器从内存提供，write_file=True时额外写入磁盘"""
         
         # 读取优化后的HTML文件
         html_file_path = os.path.join(os.path.dirname(__file__), "web_visualizer.html")
@@ -210,6 +363,7 @@ class PointCloudWebVisualizer:
         let currentSample = 0;
         let samples = [];
         let scene, camera, renderer, controls;
+        let targetPoints, sourcePoints;
         
         // 初始化Three.js场景
         function initThreeJS() {
@@ -245,6 +399,20 @@ class PointCloudWebVisualizer:
             const axesHelper = new THREE.AxesHelper(2);
             scene.add(axesHelper);
             
+            // 目标点云（蓝色）和源点云（黄色）只创建一次，切换样本时替换几何数据
+            targetPoints = new THREE.Points(new THREE.BufferGeometry(), new THREE.PointsMaterial({ 
+                color: 0x007acc, 
+                size: 0.02,
+                sizeAttenuation: true
+            }));
+            scene.add(targetPoints);
+            sourcePoints = new THREE.Points(new THREE.BufferGeometry(), new THREE.PointsMaterial({ 
+                color: 0xffcc00, 
+                size: 0.02,
+                sizeAttenuation: true
+            }));
+            scene.add(sourcePoints);
+            
             // 响应窗口大小变化
             window.addEventListener('resize', onWindowResize);
             
@@ -264,69 +432,85 @@ class PointCloudWebVisualizer:
             renderer.render(scene, camera);
         }
         
-        // 加载样本数据
+        // 从 /bin/ 接口获取 uint16 量化的二进制点云，直接作为 Uint16Array 使用
+        function fetchQuantized(url) {
+            return fetch(url)
+                .then(response => response.arrayBuffer())
+                .then(buffer => new Uint16Array(buffer));
+        }
+        
+        // 量化坐标作为 normalized 属性映射到 [0,1]，再由物体的缩放和平移还原为 lo + q * (hi - lo)
+        function placeQuantized(points, buffer) {
+            points.scale.set(buffer.hi[0] - buffer.lo[0], buffer.hi[1] - buffer.lo[1], buffer.hi[2] - buffer.lo[2]);
+            points.position.set(buffer.lo[0], buffer.lo[1], buffer.lo[2]);
+        }
+        
+        // 用新样本的量化点云替换几何数据，先释放上一个样本的GPU缓冲区
+        function updatePoints(points, vertices, buffer) {
+            const geometry = points.geometry;
+            geometry.dispose();
+            geometry.setAttribute('position', new THREE.BufferAttribute(vertices, 3, true));
+            geometry.computeBoundingSphere();
+            placeQuantized(points, buffer);
+        }
+        
+        // 加载样本数据：服务器在后台逐个加载样本，轮询 /data/count 直到全部就绪
         function loadSamples() {
-            fetch('/data')
+            fetch('/data/count')
                 .then(response => response.json())
-                .then(data => {
-                    samples = data;
-                    if (samples.length > 0) {
-                        currentSample = 0;
-                        displaySample(currentSample);
+                .then(status => {
+                    if (status.count > samples.length) {
+                        return fetch('/data')
+                            .then(response => response.json())
+                            .then(data => {
+                                const first = samples.length === 0;
+                                samples = data;
+                                if (first) {
+                                    currentSample = 0;
+                                    displaySample(currentSample);
+                                } else {
+                                    document.getElementById('sampleInfo').textContent = 
+                                        `样本 ${currentSample + 1}/${samples.length}`;
+                                }
+                            })
+                            .then(() => status);
                     }
+                    return status;
+                })
+                .then(status => {
+                    if (status.loading) setTimeout(loadSamples, 500);
                 })
                 .catch(error => console.error('加载数据失败:', error));
         }
         
-        // 显示样本
+        // 显示样本：先获取该样本的点云二进制数据
         function displaySample(index) {
-            // 清空场景
-            while(scene.children.length > 0){ 
-                scene.remove(scene.children[0]); 
-            }
-            
+            const sample = samples[index];
+            Promise.all([
+                fetchQuantized(sample.buffers.tgt.url),
+                fetchQuantized(sample.buffers.src.url)
+            ])
+                .then(([targetVertices, sourceVertices]) => {
+                    // 加载期间已切换到其他样本
+                    if (index !== currentSample) return;
+                    renderSample(index, targetVertices, sourceVertices);
+                })
+                .catch(error => console.error('加载点云失败:', error));
+        }
+        
+        // 用点云数据更新场景
+        function renderSample(index, targetVertices, sourceVertices) {
             const sample = samples[index];
             
             // 更新界面信息
             document.getElementById('sampleInfo').textContent = 
                 `样本 ${index + 1}/${samples.length}`;
             document.getElementById('pointInfo').textContent = 
-                `点数: 源: ${sample.source_points.length}, 目标: ${sample.target_points.length}`;
-            
-            // 创建目标点云（蓝色）
-            const targetGeometry = new THREE.BufferGeometry();
-            const targetVertices = new Float32Array(sample.target_points.flat());
-            targetGeometry.setAttribute('position', new THREE.BufferAttribute(targetVertices, 3));
-            const targetMaterial = new THREE.PointsMaterial({ 
-                color: 0x007acc, 
-                size: 0.02,
-                sizeAttenuation: true
-            });
-            const targetPoints = new THREE.Points(targetGeometry, targetMaterial);
-            scene.add(targetPoints);
-            
-            // 创建源点云（黄色）
-            const sourceGeometry = new THREE.BufferGeometry();
-            const sourceVertices = new Float32Array(sample.source_points.flat());
-            sourceGeometry.setAttribute('position', new THREE.BufferAttribute(sourceVertices, 3));
-            const sourceMaterial = new THREE.PointsMaterial({ 
-                color: 0xffcc00, 
-                size: 0.02,
-                sizeAttenuation: true
-            });
-            const sourcePoints = new THREE.Points(sourceGeometry, sourceMaterial);
-            scene.add(sourcePoints);
-            
-            // 添加坐标轴
-            const axesHelper = new THREE.AxesHelper(2);
-            scene.add(axesHelper);
+                `点数: 源: ${sourceVertices.length / 3}, 目标: ${targetVertices.length / 3}`;
             
-            // 添加光源
-            const ambientLight = new THREE.AmbientLight(0x404040);
-            scene.add(ambientLight);
-            const directionalLight = new THREE.DirectionalLight(0xffffff, 0.5);
-            directionalLight.position.set(1, 1, 1);
-            scene.add(directionalLight);
+            // 更新目标点云和源点云，坐标轴和光源常驻场景
+            updatePoints(targetPoints, targetVertices, sample.buffers.tgt);
+            updatePoints(sourcePoints, sourceVertices, sample.buffers.src);
         }
         
         function nextSample() {
@@ -353,38 +537,97 @@ class PointCloudWebVisualizer:
 </html>'''
             print("⚠️ 使用默认HTML内容")
         
-        # 写入HTML文件
-        with open("pointcloud_visualizer.html", "w", encoding="utf-8") as f:
-            f.write(html_content)
+        self.html_bytes = html_content.encode('utf-8')
         
-        print("✅ Web界面已生成: pointcloud_visualizer.html")
+        # 写入HTML文件
+        if write_file:
+            with open("pointcloud_visualizer.html", "w", encoding="utf-8") as f:
+                f.write(html_content)
+            print("✅ Web界面已生成: pointcloud_visualizer.html")
+        else:
+            print("✅ Web界面已生成")
     
     def start_web_server(self):
         """启动Web服务器"""
         
         class WebVisualizerHandler(http.server.SimpleHTTPRequestHandler):
             def do_GET(self):
-                if self.path == '/data':
-                    # 返回JSON数据
+                if self.path in ('/', '/pointcloud_visualizer.html'):
+                    # 页面直接从内存返回
                     self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.send_header('Content-type', 'text/html; charset=utf-8')
+                    self.send_header('Content-Length', str(len(self.html_bytes)))
                     self.end_headers()
-                    self.wfile.write(json.dumps(self.results).encode())
+                    self.wfile.write(self.html_bytes)
+                elif self.path == '/data':
+                    # 返回预先序列化的JSON元数据，点云通过 /bin/ 获取
+                    if self.accepts_gzip():
+                        self.send_payload('application/json', self.visualizer._json_gz, gzipped=True)
+                    else:
+                        self.send_payload('application/json', self.visualizer._json_bytes)
+                elif self.path == '/data/count':
+                    # 返回已加载的样本数以及后台是否仍在加载
+                    payload = orjson.dumps({'count': len(self.results), 'loading': self.visualizer.loading})
+                    self.send_payload('application/json', payload)
+                elif self.path.startswith('/bin/'):
+                    # 返回uint16量化的二进制点云: /bin/<index>/<field>
+                    try:
+                        _, _, index, field = self.path.split('/')
+                        buffer = self.results[int(index)]['buffers'][field]
+                    except (ValueError, IndexError, KeyError):
+                        self.send_error(404)
+                        return
+                    if self.accepts_gzip():
+                        self.send_payload('application/octet-stream', buffer['gz'], gzipped=True)
+                    else:
+                        # 量化数据本身是C连续的，直接写出其内存，不再经tobytes拷贝
+                        self.send_payload('application/octet-stream', buffer['data'].data.cast('B'))
                 else:
                     # 服务静态文件
                     super().do_GET()
+            
+            def accepts_gzip(self):
+                return 'gzip' in self.headers.get('Accept-Encoding', '')
+            
+            def send_payload(self, content_type, payload, gzipped=False):
+                # 返回内存中预先生成的数据，gzipped表示payload已是gzip压缩结果
+                self.send_response(200)
+                self.send_header('Content-type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                if gzipped:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Vary', 'Accept-Encoding')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def copyfile(self, source, outputfile):
+                # 静态文件用sendfile在内核中直接拷贝到socket
+                try:
+                    in_fd = source.fileno()
+                except (AttributeError, OSError):
+                    super().copyfile(source, outputfile)
+                    return
+                offset = source.tell()
+                out_fd = self.connection.fileno()
+                while True:
+                    sent = os.sendfile(out_fd, in_fd, offset, 1 << 20)
+                    if sent == 0:
+                        break
+                    offset += sent
         
         # 设置自定义处理程序
         WebVisualizerHandler.results = self.results
+        WebVisualizerHandler.visualizer = self
+        WebVisualizerHandler.html_bytes = self.html_bytes
         
         os.chdir('.')
         
         # 使用localhost绑定，避免外部访问问题
-        with socketserver.TCPServer(("localhost", self.port), WebVisualizerHandler) as httpd:
+        with ThreadingHTTPServer(("localhost", self.port), WebVisualizerHandler) as httpd:
             print(f"🌐 Web服务器启动成功!")
             print(f"📍 访问地址: http://localhost:{self.port}/pointcloud_visualizer.html")
-            print(f"📊 已加载 {len(self.results)} 个点云样本")
+            print(f"📊 已加载 {len(self.results)} 个点云样本" + ("，其余样本在后台加载中" if self.loading else ""))
             print("⏹️  按 Ctrl+C 停止服务器")
             print("-" * 50)
             
@@ -402,15 +645,21 @@ def main():
     # 创建可视化器实例
     visualizer = PointCloudWebVisualizer(snapshot_dir)
     
-    # 加载测试结果
-    if visualizer.load_test_results():
-        # 生成Web界面
-        visualizer.generate_web_interface()
-        
-        # 启动Web服务器
-        visualizer.start_web_server()
-    else:
+    # 启动服务器前先确认有可加载的测试结果
+    result_files = visualizer.find_result_files()
+    if len(result_files) == 0:
         print("❌ 无法加载测试结果，请检查快照目录")
+        return
+    
+    # 生成Web界面
+    visualizer.generate_web_interface()
+    
+    # 在后台线程中加载测试结果，服务器立即开始服务已加载的样本
+    visualizer.loading = True
+    threading.Thread(target=visualizer.load_test_results, kwargs={'result_files': result_files}, daemon=True).start()
+    
+    # 启动Web服务器
+    visualizer.start_web_server()
 
 
 if __name__ == "__main__":